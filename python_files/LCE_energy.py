@@ -1,155 +1,270 @@
+import hashlib
+import itertools
+import tempfile
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
 
+# Energy sources mapped from node label to column prefix; each source has one column per machine
+SOURCES = {
+    "Gas": "Gas",
+    "Elektrische": "Elektrische Energie",
+    "Waermeenergie": "Waermeenergie",
+    "Druckluft": "Druckluft",
+    "Oel": "Oel",
+    "Kuehlwasser": "Kuehlwasser",
+    "Heizwasser": "Heizwasser",
+    "Wasser": "Wasser",
+}
+N_MACHINES = 5
+ENERGY_COLS = [
+    f"{prefix}_{i}" for prefix in SOURCES.values() for i in range(1, N_MACHINES + 1)
+]
 
-@st.cache_data
-def load_data(file):
-    # Load data from the uploaded Excel file and convert 'Datum' to datetime format
-    data = pd.read_excel(file)
-    data["Datum"] = pd.to_datetime(
-        data["Datum"], format="%d-%m-%Y %H:%M:%S", errors="coerce"
+# High-contrast colors for nodes (each source has the same color for its links)
+SOURCE_COLORS = (
+    "#f87c24",
+    "#ff7f0e",
+    "#ffb732",
+    "#ffd27f",
+    "#D4D4D4",
+    "#909090",
+    "#ffedcc",
+    "#778899",
+)
+MACHINE_COLORS = ("#636efa", "#ef553b", "#00cc96", "#ab63fa", "#FFA15A")
+NODE_LABELS = tuple(SOURCES) + tuple(f"Maschine {i + 1}" for i in range(N_MACHINES))
+NODE_COLORS = SOURCE_COLORS + MACHINE_COLORS
+SANKEY_NODE = {
+    "pad": 15,
+    "thickness": 20,
+    "line": {"color": "white", "width": 0.5},
+    "label": NODE_LABELS,
+    "color": NODE_COLORS,
+}
+
+# Sankey links never change shape: every source links to every machine, in the same
+# (source, machine) order as ENERGY_COLS, with the link taking its source's color
+LINK_SOURCE = np.repeat(np.arange(len(SOURCES)), N_MACHINES)
+LINK_TARGET = np.tile(np.arange(len(SOURCES), len(NODE_LABELS)), len(SOURCES))
+LINK_COLORS = np.repeat(SOURCE_COLORS, N_MACHINES)
+
+# Bump when the cached per-day totals change meaning, so caches written by an older
+# version under the same content hash are not served
+CACHE_VERSION = 3
+
+# Workbook rows are converted to typed columns in batches of this size
+READ_BATCH_ROWS = 4096
+
+# Fixed-width layout of a "DD-MM-YYYY HH:MM:SS" timestamp string, plus one extra
+# character that is only empty if the string is not longer than that
+DATUM_LAYOUT = np.dtype(
+    [
+        ("day", "U2"),
+        ("sep1", "U1"),
+        ("month", "U2"),
+        ("sep2", "U1"),
+        ("year", "U4"),
+        ("sep3", "U1"),
+        ("time", "U8"),
+        ("rest", "U1"),
+    ]
+)
+
+
+def parse_datum(column):
+    # Fast path: reorder the fixed-width strings into ISO format and let NumPy parse
+    # them in one vectorized call instead of running strptime on every row. Longer
+    # values (e.g. with fractional seconds or AM/PM) are left to the strict fallback.
+    if pd.api.types.is_string_dtype(column):
+        try:
+            parts = column.to_numpy(dtype="U20").view(DATUM_LAYOUT)
+            if (
+                (parts["rest"] == "").all()
+                and (parts["sep1"] == "-").all()
+                and (parts["sep2"] == "-").all()
+                and (parts["sep3"] == " ").all()
+            ):
+                iso = np.char.add(parts["year"], "-")
+                iso = np.char.add(np.char.add(iso, parts["month"]), "-")
+                iso = np.char.add(np.char.add(iso, parts["day"]), "T")
+                iso = np.char.add(iso, parts["time"])
+                return pd.Series(
+                    iso.astype("datetime64[s]"), index=column.index, name=column.name
+                )
+        except ValueError:
+            pass
+
+    # Fallback for irregular values; cache=True parses each unique string only once
+    return pd.to_datetime(
+        column, format="%d-%m-%Y %H:%M:%S", errors="coerce", cache=True
     )
+
+
+def prepare_readings(frame):
+    # Keep only the columns the dashboard uses: 'Datum' as datetimes and the energy
+    # values as single precision, which is plenty for the diagram and halves the
+    # memory the sums read. Blank cells count as zero, as they did with pandas'
+    # NaN-skipping sums.
+    readings = frame[ENERGY_COLS].apply(pd.to_numeric, errors="coerce")
+    readings = readings.astype(np.float32).fillna(0)
+    readings.insert(0, "Datum", parse_datum(frame["Datum"]))
+    return readings
+
+
+def read_calamine(file):
+    # Read the first worksheet with the Rust calamine reader directly. Its rows are
+    # turned into Python lists one at a time, so converting them to typed columns in
+    # batches only holds READ_BATCH_ROWS rows of Python objects at once
+    from python_calamine import CalamineWorkbook
+
+    rows = CalamineWorkbook.from_filelike(file).get_sheet_by_index(0).iter_rows()
+    headers = next(rows, [])
+    frames = []
+    while batch := list(itertools.islice(rows, READ_BATCH_ROWS)):
+        # calamine reports empty cells as "", which prepare_readings coerces to
+        # NaN/NaT along with any other unparseable value
+        frames.append(prepare_readings(pd.DataFrame(batch, columns=headers)))
+
+    if not frames:
+        return prepare_readings(pd.DataFrame(columns=headers))
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_xlsx_streaming(file):
+    # Read the first worksheet row by row with openpyxl's read-only mode, which
+    # streams the sheet XML instead of building the whole workbook in memory
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = next(rows, ())
+        return pd.DataFrame(rows, columns=headers)
+    finally:
+        workbook.close()
+
+
+def read_workbook(file):
+    # Load data from the uploaded Excel file and convert 'Datum' to datetime format.
+    # The Rust-based calamine engine reads both .xls and .xlsx and is much faster than openpyxl.
+    try:
+        data = read_calamine(file)
+    except ImportError:
+        # python-calamine is not installed: stream .xlsx files, let pandas handle .xls
+        if getattr(file, "name", "").lower().endswith(".xls"):
+            data = prepare_readings(pd.read_excel(file))
+        else:
+            data = prepare_readings(read_xlsx_streaming(file))
+    # Sort chronologically so that each day occupies a contiguous block of rows
+    data = data.sort_values("Datum", kind="mergesort").reset_index(drop=True)
+    # Calendar day of each reading, stored as datetime64 rather than Python date objects
+    data["Date"] = data["Datum"].to_numpy().astype("datetime64[D]")
     return data
 
 
-def create_sankey_diagram(data, selected_date):
-    # Filter data for the selected date
-    filtered_data = data[data["Datum"].dt.date == selected_date]
-
-    # Aggregating the total values for all energy sources
-    sources = {
-        "Gas": filtered_data[["Gas_1", "Gas_2", "Gas_3", "Gas_4", "Gas_5"]]
-        .sum()
-        .values,
-        "Elektrische": filtered_data[
-            [
-                "Elektrische Energie_1",
-                "Elektrische Energie_2",
-                "Elektrische Energie_3",
-                "Elektrische Energie_4",
-                "Elektrische Energie_5",
-            ]
-        ]
-        .sum()
-        .values,
-        "Waermeenergie": filtered_data[
-            [
-                "Waermeenergie_1",
-                "Waermeenergie_2",
-                "Waermeenergie_3",
-                "Waermeenergie_4",
-                "Waermeenergie_5",
-            ]
-        ]
-        .sum()
-        .values,
-        "Druckluft": filtered_data[
-            ["Druckluft_1", "Druckluft_2", "Druckluft_3", "Druckluft_4", "Druckluft_5"]
-        ]
-        .sum()
-        .values,
-        "Oel": filtered_data[["Oel_1", "Oel_2", "Oel_3", "Oel_4", "Oel_5"]]
-        .sum()
-        .values,
-        "Kuehlwasser": filtered_data[
-            [
-                "Kuehlwasser_1",
-                "Kuehlwasser_2",
-                "Kuehlwasser_3",
-                "Kuehlwasser_4",
-                "Kuehlwasser_5",
-            ]
-        ]
-        .sum()
-        .values,
-        "Heizwasser": filtered_data[
-            [
-                "Heizwasser_1",
-                "Heizwasser_2",
-                "Heizwasser_3",
-                "Heizwasser_4",
-                "Heizwasser_5",
-            ]
-        ]
-        .sum()
-        .values,
-        "Wasser": filtered_data[
-            ["Wasser_1", "Wasser_2", "Wasser_3", "Wasser_4", "Wasser_5"]
-        ]
-        .sum()
-        .values,
-    }
+def write_cache_file(path, write):
+    # Write to a temporary name first so a partial file is never picked up; a failed
+    # write (e.g. a read-only temp dir) only means the cache is skipped next time
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        write(tmp_path)
+        tmp_path.replace(path)
+    except OSError:
+        pass
 
-    # Define high-contrast colors for nodes (each source has the same color for its links)
-    source_colors = [
-        "#f87c24",
-        "#ff7f0e",
-        "#ffb732",
-        "#ffd27f",
-        "#D4D4D4",
-        "#909090",
-        "#ffedcc",
-        "#778899",
-    ]
 
-    # Preparing Sankey diagram input
-    source = []
-    target = []
-    values = []
-    link_colors = []
-
-    for i, (key, values_array) in enumerate(sources.items()):
-        for j, value in enumerate(values_array):
-            source.append(i)  # Energy source
-            target.append(len(sources) + j)  # Machines
-            values.append(value)
-            link_colors.append(
-                source_colors[i]
-            )  # Use the same color for all links from a source
-
-    # Define node labels
-    node_labels = list(sources.keys()) + [f"Maschine {i + 1}" for i in range(5)]
-
-    # Create the Sankey diagram
-    fig = go.Figure(
-        data=[
-            go.Sankey(
-                node=dict(
-                    pad=15,
-                    thickness=20,
-                    line=dict(color="white", width=0.5),
-                    label=node_labels,
-                    color=source_colors
-                    + [
-                        "#636efa",
-                        "#ef553b",
-                        "#00cc96",
-                        "#ab63fa",
-                        "#FFA15A",
-                    ],  # Extend for machines
-                ),
-                link=dict(
-                    source=source,
-                    target=target,
-                    value=values,
-                    color=link_colors,
-                    hovertemplate="Value: %{value:.2f}<extra></extra>",
-                ),
-            )
-        ]
+def daily_totals(readings):
+    # Unparseable dates (NaT) sort last and are skipped; every other day is a
+    # contiguous block of rows starting wherever the date changes
+    days = readings["Date"].to_numpy().astype("datetime64[D]")
+    days = days[~np.isnat(days)]
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])[: len(days)]
+
+    # All energy readings as one contiguous (rows, sources * machines) block, so the
+    # totals of every day come from a single reduceat, accumulated in double precision
+    energy_block = readings[ENERGY_COLS].to_numpy(dtype=np.float32)[: len(days)]
+    if len(starts):
+        sums = np.add.reduceat(energy_block, starts, axis=0, dtype=np.float64)
+    else:
+        sums = np.zeros((0, len(ENERGY_COLS)))
+    return pa.table(
+        {"Date": days[starts], **{col: sums[:, i] for i, col in enumerate(ENERGY_COLS)}}
     )
 
-    fig.update_layout(
-        title_text=f"Sankey Diagram for Energy Distribution on {selected_date}",
-        font_size=10,
-        width=1400,  # Increased width
-        height=700,  # Increased height
-        plot_bgcolor="#1e1e1e",
-        paper_bgcolor="#1e1e1e",
-        font_color="white",
+
+@st.cache_data
+def load_data(file):
+    # The per-day totals are all the dashboard needs; they are persisted as a Feather
+    # file keyed by the upload's content hash, so a restarted app skips both the slow
+    # Excel parsing and the aggregation for a file it has seen before
+    digest = hashlib.blake2b(file.getbuffer(), digest_size=16).hexdigest()
+    cache_path = (
+        Path(tempfile.gettempdir()) / f"lce_agg_v{CACHE_VERSION}_{digest}.feather"
     )
-    return fig
+    if cache_path.exists():
+        daily = feather.read_table(cache_path)
+    else:
+        daily = daily_totals(read_workbook(file))
+        write_cache_file(
+            cache_path,
+            lambda path: feather.write_feather(daily, path, compression="uncompressed"),
+        )
+
+    # One row of totals per day, and a map from each day to its row
+    totals = np.column_stack([daily.column(col).to_numpy() for col in ENERGY_COLS])
+    days = daily.column("Date").to_numpy()
+    date_index = dict(zip(days.tolist(), range(len(days))))
+    return totals, date_index
+
+
+def energy_totals(totals, date_index, selected_date):
+    # Look up the selected day's row of totals (all zero if there were no readings)
+    row = date_index.get(selected_date)
+    if row is None:
+        return np.zeros((len(SOURCES), N_MACHINES))
+    return totals[row].reshape(len(SOURCES), N_MACHINES)
+
+
+# Revisiting a date reuses the cached figure instead of rebuilding it
+@st.cache_data(max_entries=128)
+def create_sankey_diagram(agg, selected_date, min_share=0.0):
+    # Drop links that are empty or below min_share of the largest flow; each link
+    # is an SVG path the browser has to lay out even when it is invisibly thin
+    values = agg.ravel()
+    keep = values > values.max(initial=0.0) * min_share
+
+    # Create the Sankey diagram as a plain figure dict, which is cheaper to pickle into
+    # the cache and unpickle on each hit than a go.Figure
+    return {
+        "data": [
+            {
+                "type": "sankey",
+                "node": SANKEY_NODE,
+                "link": {
+                    "source": LINK_SOURCE[keep],
+                    "target": LINK_TARGET[keep],
+                    "value": values[keep],
+                    "color": LINK_COLORS[keep].tolist(),
+                    "hovertemplate": "Value: %{value:.2f}<extra></extra>",
+                },
+            }
+        ],
+        "layout": {
+            "title": {
+                "text": f"Sankey Diagram for Energy Distribution on {selected_date}"
+            },
+            "font": {"size": 10, "color": "white"},
+            "width": 1400,  # Increased width
+            "height": 700,  # Increased height
+            "plot_bgcolor": "#1e1e1e",
+            "paper_bgcolor": "#1e1e1e",
+        },
+    }
 
 
 def main():
@@ -163,24 +278,36 @@ def main():
 
     if uploaded_file is not None:
         # Load data from the uploaded file
-        data = load_data(uploaded_file)
+        totals, date_index = load_data(uploaded_file)
 
         # Slider for selecting the date
         st.sidebar.title("Select Date")
-        data["Date"] = data["Datum"].dt.date  # Extract date from 'Datum'
-        date_options = data["Date"].unique()  # Get unique dates from 'Datum' column
+        first_date = next(iter(date_index))
+        last_date = next(reversed(date_index))
         selected_date = st.sidebar.slider(
             "Select Date",
-            min_value=min(date_options),
-            max_value=max(date_options),
-            value=min(date_options),  # Default to the first date
+            min_value=first_date,
+            max_value=last_date,
+            value=first_date,  # Default to the first date
             format="YYYY-MM-DD",
         )
 
+        # Slider for hiding negligible flows to keep the diagram light
+        min_share_pct = st.sidebar.slider(
+            "Hide flows below (% of largest flow)",
+            min_value=0.0,
+            max_value=5.0,
+            value=0.1,
+            step=0.1,
+        )
+
         # Create the Sankey diagram for the selected date
-        sankey_fig = create_sankey_diagram(data, selected_date)
+        agg = energy_totals(totals, date_index, selected_date)
+        sankey_fig = create_sankey_diagram(agg, selected_date, min_share_pct / 100)
         if sankey_fig:
-            st.plotly_chart(sankey_fig)
+            # A stable key lets the frontend update the existing chart in place
+            # instead of tearing it down and re-creating it on every slider move
+            st.plotly_chart(sankey_fig, key="sankey_energy")
 
 
 if __name__ == "__main__":
@@ -1,17 +1,75 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 from streamlit_plotly_events import plotly_events
 import plotly.express as px
 import re
 
+# Pattern for runs of spaces, collapsed to a single space when normalizing text
+MULTIPLE_SPACES = re.compile(' +')
+
+# Mapping from the full (normalized) indicator names to abbreviations for better readability
+INDICATOR_ABBREVIATIONS = {
+    'carcinogenic effects - total': 'CT',
+    'biogenic': 'BG',
+    'climate change - total': 'CC',
+    'fossils': 'FS',
+    'fossil': 'FO',
+    'freshwater and terrestrial acidification': 'FTA',
+    'freshwater ecotoxicity - total': 'FET',
+    'freshwater eutrophication': 'FE',
+    'ionizing radiation': 'IR',
+    'land use': 'LU',
+    'land use and land use change': 'LUC',
+    'marine eutrophication': 'ME',
+    'minerals and metals': 'MM',
+    'non-carcinogenic effects - total': 'NCT',
+    'ozone layer depletion': 'OLD',
+    'photochemical ozone creation': 'POC',
+    'terrestrial eutrophication': 'TE',
+    'water scarcity': 'WS'
+}
+
+# The known indicators in display order, used for the heatmap columns and the correlation matrix
+INDICATORS = tuple(INDICATOR_ABBREVIATIONS)
+
+# Mapping of indicators to their respective units for the y-axis
+Y_AXIS_TITLES = {
+    'carcinogenic effects - total': 'CTUh',
+    'biogenic': 'kg CO2-Eq',
+    'climate change - total': 'kg CO2-Eq',
+    'fossils': 'MJ',
+    'fossil': 'kg CO2-Eq',
+    'freshwater and terrestrial acidification': 'mol H+-Eq',
+    'freshwater ecotoxicity - total': 'CTUe',
+    'freshwater eutrophication': 'kg P-Eq',
+    'ionizing radiation': 'kBq U235-Eq',
+    'land use': 'points',
+    'land use and land use change': 'kg CO2-Eq',
+    'marine eutrophication': 'kg N-Eq',
+    'minerals and metals': 'kg Sb-Eq',
+    'non-carcinogenic effects - total': 'CTUh',
+    'ozone layer depletion': 'kg CFC-11-Eq',
+    'photochemical ozone creation': 'kg NMVOC-Eq',
+    'terrestrial eutrophication': 'mol N-Eq',
+    'water scarcity': 'm3 world-Eq deprived'
+}
+
 # Function to load the Excel data file into a DataFrame.
 # This function is cached to optimize performance, so it doesn't reload the file multiple times.
-# It reads the file and returns the DataFrame containing the data.
+# It reads the file with the Rust-based calamine engine, which is much faster than openpyxl,
+# and falls back to pandas' default reader if python-calamine is not installed.
+# If usecols is given, only those columns are kept; columns missing from the file are skipped
+# rather than raising, so the caller can report them.
 
 @st.cache_data
-def load_data(file):
-    return pd.read_excel(file)
+def load_data(file, usecols=None):
+    columns = (lambda col: col in usecols) if usecols is not None else None
+    try:
+        return pd.read_excel(file, engine="calamine", usecols=columns)
+    except ImportError:
+        return pd.read_excel(file, usecols=columns)
 
 # Function to normalize text by stripping extra spaces and converting to lowercase.
 # This ensures that column values like 'Car Type', 'Country', and 'Indicator' are consistent
@@ -19,9 +77,77 @@ def load_data(file):
 
 def normalize_text(text):
     if isinstance(text, str):
-        return re.sub(' +', ' ', text.strip()).lower()
+        return MULTIPLE_SPACES.sub(' ', text.strip()).lower()
     return text
 
+# Vectorized version of normalize_text for whole DataFrame columns.
+# The pandas string methods run over the entire column at once instead of calling a Python
+# function per row; non-string values are left untouched, just like in normalize_text.
+# Columns without any strings (e.g. numbers stored as objects) are returned as they are,
+# since the string methods can't be used on them.
+
+def normalize_column(series):
+    if pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'mixed', 'mixed-integer'):
+        return series
+    normalized = series.str.strip().str.replace(MULTIPLE_SPACES, ' ', regex=True).str.lower()
+    return normalized.where(normalized.notna(), series)
+
+# Hash function for the DataFrame arguments of the cached functions below.
+# It hashes every row of the frame together with its shape and column names, so a cached result is
+# only reused when the data it was computed from is identical. (Streamlit's default DataFrame hash
+# only looks at a sample of the rows of large frames.)
+
+def hash_frame(df):
+    return df.shape, tuple(df.columns), pd.util.hash_pandas_object(df, index=False).values.tobytes()
+
+# Function to normalize the uploaded LCA data once per file.
+# The 'Year' column is converted to integers and the text columns used for filtering are normalized.
+# It is cached so that widget interactions, which rerun the whole script, don't redo this work.
+
+@st.cache_data(hash_funcs={pd.DataFrame: hash_frame})
+def normalize_df(df):
+    df = df.copy()
+    # Years read as text (e.g. '2,030') are stripped of thousands separators first; the numeric
+    # conversion then stores them in the smallest integer type (int16 for years)
+    if not pd.api.types.is_integer_dtype(df['Year']):
+        df['Year'] = df['Year'].astype(str).str.replace(',', '', regex=False)
+    df['Year'] = pd.to_numeric(df['Year'], downcast='integer', errors='coerce')
+    df['Country'] = normalize_column(df['Country'])
+    df['Car Type'] = normalize_column(df['Car Type'])
+    df['Indicator'] = normalize_column(df['Indicator'])
+
+    # Store the low-cardinality text columns as categoricals, so that filtering and grouping
+    # work on small integer codes instead of Python string objects
+    for col in ['Country', 'Car Type', 'Indicator', 'ReferenceFlow']:
+        df[col] = df[col].astype('category')
+    return df
+
+# Function to filter the normalized data by the user's selections.
+# Empty selections don't filter. It is not cached: hashing the frame for a cache lookup costs
+# about as much as the single mask pass below, and every selection would store another copy.
+
+def apply_filters(df, scenarios, years, car_types, indicators, reference_flows):
+    # Combine all selections into one boolean mask and select the rows in a single pass
+    mask = np.ones(len(df), dtype=bool)
+    if scenarios:
+        mask &= df['Country'].isin(scenarios).to_numpy()
+    if years:
+        mask &= df['Year'].isin([int(y) for y in years]).to_numpy()
+    if car_types:
+        mask &= df['Car Type'].isin(car_types).to_numpy()
+    if indicators:
+        mask &= df['Indicator'].isin(indicators).to_numpy()
+    if reference_flows:
+        mask &= df['ReferenceFlow'].isin(reference_flows).to_numpy()
+    return df[mask]
+
+# Hash function for the sunburst chart, which only reads the 'LifeCyclePhase' and 'Process' columns.
+# Hashing just those two columns is cheaper than the whole frame, and filter changes that leave them
+# unchanged reuse the cached figure.
+
+def hash_lca_frame(df):
+    return len(df), pd.util.hash_pandas_object(df[['LifeCyclePhase', 'Process']], index=False).values.tobytes()
+
 def main():
 
     """
@@ -79,52 +205,41 @@ def main():
     # If the user has uploaded a file, process it and generate visualizations
     if uploaded_file_1 is not None:
         try:
-            # Load the uploaded file into a DataFrame
-            df = load_data(uploaded_file_1)
+            # Load the columns used by the dashboard from the uploaded file into a DataFrame
+            required_columns = ['Country', 'Year', 'Car Type', 'ReferenceFlow', 'Quantity', 'LifeCyclePhase', 'Indicator', 'Process']
+            df = load_data(uploaded_file_1, tuple(required_columns))
 
             # Ensure the necessary columns are present in the uploaded file
-            required_columns = ['Country', 'Year', 'Car Type', 'ReferenceFlow', 'Quantity', 'LifeCyclePhase', 'Indicator', 'Process']
             if not all(col in df.columns for col in required_columns):
                 st.error(f"Missing columns in the uploaded file.")
                 return
 
-            # Normalize the 'Year' column and convert it to integer for comparison
-            df['Year'] = df['Year'].astype(str).str.replace(',', '').astype(int)
-
-            # Normalize relevant columns to handle extra spaces and inconsistencies in the data
-            df['Country'] = df['Country'].apply(normalize_text)
-            df['Car Type'] = df['Car Type'].apply(normalize_text)
-            df['Indicator'] = df['Indicator'].apply(normalize_text)
+            # Normalize the 'Year' column and the text columns (cached per uploaded file)
+            df = normalize_df(df)
 
             # Normalize the filter selections to ensure they match the format in the DataFrame
             geographic_scenario = [normalize_text(scenario) for scenario in geographic_scenario]
             car_type = [normalize_text(ctype) for ctype in car_type]
             indicator = [normalize_text(ind) for ind in indicator]
 
-            # Filter the dataset based on user-selected values in the filters
-            filtered_df = df.copy()
-            if geographic_scenario:
-                filtered_df = filtered_df[filtered_df['Country'].isin(geographic_scenario)]
-            if year:
-                filtered_df = filtered_df[filtered_df['Year'].isin([int(y) for y in year])]
-            if car_type:
-                filtered_df = filtered_df[filtered_df['Car Type'].isin(car_type)]
-            if indicator:
-                filtered_df = filtered_df[filtered_df['Indicator'].isin(indicator)]
-
-            # Further filter the data based on specific reference flows of interest
+            # Filter the dataset based on user-selected values in the filters,
+            # and further on the specific reference flows of interest
             reference_flows = ['Bauteil Tür (eingebaut)_Funier-50/50-Stahl', 'Bauteil Tür (eingebaut)_Stahl A-50/50-Stahl B', 'Serienbauteil Hutprofil (eingebaut)', 'Hybridbauteil Hutprofil (eingebaut)']
-            filtered_df = filtered_df[filtered_df['ReferenceFlow'].isin(reference_flows)]
+            filtered_df = apply_filters(df, tuple(geographic_scenario), tuple(year), tuple(car_type),
+                                        tuple(indicator), tuple(reference_flows))
 
             # Create a bar chart visualization based on the filtered data
-            create_bar_chart_1(filtered_df, indicator)
+            bar_fig = create_bar_chart_1(filtered_df, tuple(indicator))
+            if bar_fig is not None:
+                st.plotly_chart(bar_fig, key="bar_main")
+            else:
+                st.write("No data available for the selected filters.")
 
             # Only create the heatmap if Year and Car Type are selected
             if year and car_type:
-                heatmap_filtered_df = df.copy()  # Use the original DataFrame to include all scenarios and indicators
-                heatmap_filtered_df = heatmap_filtered_df[heatmap_filtered_df['Year'].isin([int(y) for y in year])]
-                heatmap_filtered_df = heatmap_filtered_df[heatmap_filtered_df['Car Type'].isin(car_type)]
-                create_heatmap(heatmap_filtered_df)
+                # Use the original DataFrame to include all scenarios and indicators
+                heatmap_filtered_df = apply_filters(df, (), tuple(year), tuple(car_type), (), ())
+                st.plotly_chart(create_heatmap(heatmap_filtered_df), key="heatmap_scenarios")
 
             # Display buttons to toggle between different visualizations
             col1, col2, col3 = st.columns(3)
@@ -160,55 +275,45 @@ def main():
 
     if st.session_state.show_assessment:
         if "filtered_df" in st.session_state:
-            detailed_lifecycle_assessment(st.session_state.filtered_df)
+            try:
+                st.plotly_chart(detailed_lifecycle_assessment(st.session_state.filtered_df), key="sunburst_lca")
+            except Exception as e:
+                st.error(f"Error: {e}")
+                st.write("Please make sure the uploaded data is valid.")
             
             # Show scatter plot after the detailed lifecycle assessment is displayed
             if indicator:
-                create_scatter_plot_with_difference(df, indicator)
+                scatter_fig = create_scatter_plot_with_difference(df, tuple(indicator))
+                if scatter_fig is not None:
+                    st.plotly_chart(scatter_fig, key="scatter_diff")
+                else:
+                    st.write("No data available for the selected filters to generate the scatter plot.")
 
         else:
             st.error("Filtered data not available. Please apply filters and try again.")
 
     if st.session_state.show_correlation_matrix:
         if "filtered_df" in st.session_state:
-            create_correlation_matrix(st.session_state.filtered_df, geographic_scenario, year, car_type)
+            corr_fig = create_correlation_matrix(st.session_state.filtered_df, tuple(geographic_scenario),
+                                                 tuple(year), tuple(car_type))
+            st.plotly_chart(corr_fig, key="corr_matrix")
         else:
             st.error("Filtered data not available. Please apply filters and try again.")
 
-# Function to create and display the correlation matrix heatmap
+# Function to create the correlation matrix heatmap
 # The correlation matrix visualizes the relationships between different environmental indicators
 # The indicator names are replaced by abbreviations for a more concise and readable display
+# Like the other chart builders, it is cached, so unchanged inputs reuse the previously built figure
             
+@st.cache_data(hash_funcs={pd.DataFrame: hash_frame})
 def create_correlation_matrix(df, selected_scenarios, selected_years, selected_car_types):
     """
     This function generates a correlation matrix heatmap for the selected indicators.
     It calculates the correlation between different environmental indicators based on the filtered data
     and displays it as a heatmap.
     """
-    # Define a mapping from full indicator names to abbreviations for better readability
-    indicator_abbreviations = {
-        'carcinogenic effects - total': 'CT',
-        'biogenic': 'BG',
-        'climate change - total': 'CC',
-        'fossils': 'FS',
-        'fossil': 'FO',
-        'freshwater and terrestrial acidification': 'FTA',
-        'freshwater ecotoxicity - total': 'FET',
-        'freshwater eutrophication': 'FE',
-        'ionizing radiation': 'IR',
-        'land use': 'LU',
-        'land use and land use change': 'LUC',
-        'marine eutrophication': 'ME',
-        'minerals and metals': 'MM',
-        'non-carcinogenic effects - total': 'NCT',
-        'ozone layer depletion': 'OLD',
-        'photochemical ozone creation': 'POC',
-        'terrestrial eutrophication': 'TE',
-        'water scarcity': 'WS'
-    }
-
     # Filter the data based on the selected indicators and other filters (geographic scenario, year, car type)
-    filtered_df = df[df['Indicator'].isin(indicator_abbreviations.keys())]
+    filtered_df = df[df['Indicator'].isin(INDICATORS)]
     
     # Apply filters based on selected geographic scenarios, car types, and years
     if selected_scenarios:
@@ -219,17 +324,28 @@ def create_correlation_matrix(df, selected_scenarios, selected_years, selected_c
         filtered_df = filtered_df[filtered_df['Car Type'].isin(selected_car_types)]
     
     # Pivot the data to calculate quantities for each indicator across the selected categories
-    pivot_df = filtered_df.pivot_table(index=['Country', 'Year', 'Car Type'], 
+    pivot_df = filtered_df.pivot_table(index=['Country', 'Year', 'Car Type'], observed=True,
                                        columns='Indicator', 
                                        values='Quantity', 
                                        aggfunc='sum', fill_value=0)
     
-    # Calculate the correlation matrix between the indicators
-    correlation_matrix = pivot_df.corr()
+    # Calculate the correlation matrix between the indicators in a single numpy pass; indicators
+    # without variance (or fewer than two rows) get NaN correlations, as pandas' .corr() does
+    values = pivot_df.to_numpy(dtype=np.float64)
+    n_indicators = values.shape[1]
+    if len(values) > 1:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.corrcoef(values, rowvar=False).reshape(n_indicators, n_indicators)
+        constant = (values == values[0]).all(axis=0)
+        corr[constant, :] = np.nan
+        corr[:, constant] = np.nan
+    else:
+        corr = np.full((n_indicators, n_indicators), np.nan)
+    correlation_matrix = pd.DataFrame(corr, index=pivot_df.columns, columns=pivot_df.columns)
 
     # Replace full indicator names with their abbreviations in the correlation matrix
-    correlation_matrix.columns = [indicator_abbreviations.get(col, col) for col in correlation_matrix.columns]
-    correlation_matrix.index = [indicator_abbreviations.get(idx, idx) for idx in correlation_matrix.index]
+    correlation_matrix.columns = [INDICATOR_ABBREVIATIONS.get(col, col) for col in correlation_matrix.columns]
+    correlation_matrix.index = [INDICATOR_ABBREVIATIONS.get(idx, idx) for idx in correlation_matrix.index]
 
     # Create and display the heatmap for the correlation matrix using Plotly
     fig = go.Figure(data=go.Heatmap(
@@ -248,27 +364,27 @@ def create_correlation_matrix(df, selected_scenarios, selected_years, selected_c
         template="plotly_dark"
     )
 
-    st.plotly_chart(fig)
+    return fig
 
 # Function to generate the scatter plot comparing differences between pairs of reference flows
+@st.cache_data(hash_funcs={pd.DataFrame: hash_frame})
 def create_scatter_plot_with_difference(df, selected_indicators):
     """
     This function generates a scatter plot comparing the differences in quantities
     between pairs of reference flows for the selected indicator.
     The scatter plot allows for a visual comparison of how the quantities for different
     reference flows differ across years and car types.
+    It returns None if there is no data to plot.
     """
     if not selected_indicators:
-        st.write("Please select at least one indicator to generate the scatter plot.")
-        return
+        return None
 
     # Ensure we only work with the selected indicator
     indicator = selected_indicators[0]
     df = df[df['Indicator'] == indicator]
 
     if df.empty:
-        st.write("No data available for the selected indicator to generate the scatter plot.")
-        return
+        return None
 
     # Define the pairs of reference flows to compare
     reference_pairs = [
@@ -276,38 +392,44 @@ def create_scatter_plot_with_difference(df, selected_indicators):
         ('Bauteil Tür (eingebaut)_Funier-50/50-Stahl', 'Bauteil Tür (eingebaut)_Stahl A-50/50-Stahl B')
     ]
 
-    scatter_data = []
+    # Sum the quantities per year, car type and reference flow in a single groupby;
+    # flows that don't occur for a year and car type are left as NaN
+    quantities = df.groupby(['Year', 'Car Type', 'ReferenceFlow'], observed=True)['Quantity'].sum().unstack('ReferenceFlow')
 
-    # Loop through the years and car types to calculate the difference in quantities for each reference flow pair
-    for year in df['Year'].unique():
-        for car_type in df['Car Type'].unique():
-            car_type_year_df = df[(df['Car Type'] == car_type) & (df['Year'] == year)]
-            
-            for pair in reference_pairs:
-                # Check if both reference flows are present in the filtered data
-                if set(pair).issubset(set(car_type_year_df['ReferenceFlow'])):
-                    # Calculate the difference in Quantity between the two reference flows
-                    ref_flow_1_quantity = car_type_year_df[car_type_year_df['ReferenceFlow'] == pair[0]]['Quantity'].sum()
-                    ref_flow_2_quantity = car_type_year_df[car_type_year_df['ReferenceFlow'] == pair[1]]['Quantity'].sum()
-                    
-                    # Calculate difference in the correct order (first - second)
-                    diff = ref_flow_1_quantity - ref_flow_2_quantity
-                    
-                    # Append the calculated difference to the scatter data
-                    scatter_data.append({
-                        'Car Type': car_type,
-                        'Year': year,
-                        'Reference Flow 1': pair[0],
-                        'Reference Flow 2': pair[1],
-                        'Difference': diff,
-                        'Indicator': indicator
-                    })
-
-    # Convert the scatter data to a DataFrame for plotting
-    scatter_df = pd.DataFrame(scatter_data)
+    # Calculate the difference in quantities for each reference flow pair (first - second).
+    # The difference is only defined where both reference flows are present.
+    differences = {
+        pair_index: quantities[pair[0]] - quantities[pair[1]]
+        for pair_index, pair in enumerate(reference_pairs)
+        if pair[0] in quantities.columns and pair[1] in quantities.columns
+    }
+
+    scatter_df = pd.DataFrame(columns=['Car Type', 'Year', 'Reference Flow 1', 'Reference Flow 2', 'Difference', 'Indicator'])
+    if differences:
+        # Order the points by year, then car type (both in order of appearance), then pair
+        order = pd.MultiIndex.from_product(
+            [df['Year'].unique(), df['Car Type'].unique(), range(len(reference_pairs))],
+            names=['Year', 'Car Type', 'Pair']
+        )
+        differences = (pd.concat(differences, names=['Pair'])
+                       .reorder_levels(['Year', 'Car Type', 'Pair'])
+                       .reindex(order)
+                       .dropna())
+        pairs = differences.index.get_level_values('Pair')
+
+        # Collect the calculated differences into a DataFrame for plotting
+        scatter_df = pd.DataFrame({
+            'Car Type': differences.index.get_level_values('Car Type'),
+            'Year': differences.index.get_level_values('Year'),
+            'Reference Flow 1': [reference_pairs[p][0] for p in pairs],
+            'Reference Flow 2': [reference_pairs[p][1] for p in pairs],
+            'Difference': differences.values,
+            'Indicator': indicator
+        })
 
     if not scatter_df.empty:
-        # Create and display the scatter plot using Plotly
+        # Create the scatter plot using Plotly, drawn with WebGL (scattergl) so that large exports
+        # with many year, car type and pair combinations render on a single canvas
         fig = px.scatter(
             scatter_df,
             x='Car Type',
@@ -315,7 +437,8 @@ def create_scatter_plot_with_difference(df, selected_indicators):
             color='Year',
             title=f"Scatter Plot for Indicator: {indicator.title()}",
             labels={'Difference': 'Difference (Quantity)', 'Car Type': 'Car Type', 'Year': 'Year'},
-            template="plotly_dark"
+            template="plotly_dark",
+            render_mode='webgl'
         )
 
         fig.update_traces(
@@ -327,16 +450,16 @@ def create_scatter_plot_with_difference(df, selected_indicators):
                           "<b>Reference Flow 2:</b> %{customdata[4]}<extra></extra>"
         )
 
-        st.plotly_chart(fig)
-    else:
-        st.write("No data available for the selected filters to generate the scatter plot.")
+        return fig
+    return None
 
-# Function to create and display the bar chart of reference flows and their quantities
+# Function to create the bar chart of reference flows and their quantities
+@st.cache_data(hash_funcs={pd.DataFrame: hash_frame})
 def create_bar_chart_1(df, selected_indicators):
     """
     This function generates a bar chart that visualizes the quantities of selected reference flows
     for the chosen indicators. The chart is grouped by the reference flows, and it shows the sum
-    of the quantities for each reference flow.
+    of the quantities for each reference flow. It returns None if all quantities are zero.
     """
     reference_flows = [
         'Bauteil Tür (eingebaut)_Funier-50/50-Stahl',
@@ -351,52 +474,25 @@ def create_bar_chart_1(df, selected_indicators):
         'Hybridbauteil'
     ]
 
-    quantities = [df[df['ReferenceFlow'] == rf]['Quantity'].sum() for rf in reference_flows]
-
-    # Mapping of indicators to their respective units for the y-axis
-    y_axis_titles = {
-        'carcinogenic effects - total': 'CTUh',
-        'biogenic': 'kg CO2-Eq',
-        'climate change - total': 'kg CO2-Eq',
-        'fossils': 'MJ',
-        'fossil': 'kg CO2-Eq',
-        'freshwater and terrestrial acidification': 'mol H+-Eq',
-        'freshwater ecotoxicity - total': 'CTUe',
-        'freshwater eutrophication': 'kg P-Eq',
-        'ionizing radiation': 'kBq U235-Eq',
-        'land use': 'points',
-        'land use and land use change': 'kg CO2-Eq',
-        'marine eutrophication': 'kg N-Eq',
-        'minerals and metals': 'kg Sb-Eq',
-        'non-carcinogenic effects - total': 'CTUh',
-        'ozone layer depletion': 'kg CFC-11-Eq',
-        'photochemical ozone creation': 'kg NMVOC-Eq',
-        'terrestrial eutrophication': 'mol N-Eq',
-        'water scarcity': 'm3 world-Eq deprived'
-    }
-
-    y_axis_title = y_axis_titles.get(selected_indicators[0], 'Units') if selected_indicators else 'Units'
+    # Sum the quantities of all reference flows in a single pass
+    quantities = df.groupby('ReferenceFlow', observed=True, sort=False)['Quantity'].sum().reindex(reference_flows, fill_value=0).values
 
-    # Prepare the data for the bar chart
-    bar_chart_data = pd.DataFrame({
-        'ReferenceFlow': new_names,
-        'Quantity': quantities
-    })
+    y_axis_title = Y_AXIS_TITLES.get(selected_indicators[0], 'Units') if selected_indicators else 'Units'
 
-    if bar_chart_data['Quantity'].sum() != 0:
+    if quantities.sum() != 0:
         # Customize bar colors and create the bar chart
         custom_colors = ['#F57600', '#395d78', '#FF8C00', '#808080']
 
         fig = go.Figure()
 
-        for index, row in bar_chart_data.iterrows():
-            fig.add_trace(go.Bar(
-                x=[row['ReferenceFlow']],
-                y=[row['Quantity']],
-                name=row['ReferenceFlow'],
-                marker_color=custom_colors[index],
-                hovertext=[row['Quantity']]
-            ))
+        # A single trace with one colored bar per reference flow; the hover label shows the
+        # quantity with the reference flow's name next to it
+        fig.add_trace(go.Bar(
+            x=new_names,
+            y=quantities,
+            marker_color=custom_colors,
+            hovertemplate='%{y:.3g}<extra>%{x}</extra>'
+        ))
 
         # Update layout with titles and styling
         fig.update_layout(
@@ -415,41 +511,33 @@ def create_bar_chart_1(df, selected_indicators):
                 color="#7f7f7f"
             ),
             plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            barmode='group'
+            paper_bgcolor='rgba(0,0,0,0)'
         )
 
-        st.plotly_chart(fig)
-    else:
-        st.write("No data available for the selected filters.")
+        return fig
+    return None
     
 # Function to create a heatmap visualizing the distribution of indicators across scenarios
+@st.cache_data(hash_funcs={pd.DataFrame: hash_frame})
 def create_heatmap(df):
     """
     This function generates a heatmap that visualizes the percentage distribution of selected environmental indicators
     across different geographic scenarios. The heatmap helps identify how different indicators are distributed
     across the scenarios.
     """
-    indicators = [
-        'carcinogenic effects - total', 'biogenic', 'climate change - total',
-        'fossils', 'fossil', 'freshwater and terrestrial acidification',
-        'freshwater ecotoxicity - total', 'freshwater eutrophication',
-        'ionizing radiation', 'land use', 'land use and land use change',
-        'marine eutrophication', 'minerals and metals',
-        'non-carcinogenic effects - total', 'ozone layer depletion',
-        'photochemical ozone creation', 'terrestrial eutrophication',
-        'water scarcity'
-    ]
-
-    heatmap_data = []
-    for scenario in df['Country'].unique():
-        scenario_data = df[df['Country'] == scenario]
-        total_quantity = scenario_data['Quantity'].sum()
-        scenario_percentages = [scenario_data[scenario_data['Indicator'] == indicator]['Quantity'].sum() / total_quantity * 100 if total_quantity else 0 for indicator in indicators]
-        heatmap_data.append(scenario_percentages)
-
-    # Prepare the data for the heatmap
-    heatmap_df = pd.DataFrame(heatmap_data, columns=indicators, index=df['Country'].unique())
+    # Sum the quantities per scenario and indicator in one pass, then express each indicator
+    # as a percentage of the scenario's total quantity (0 for scenarios with a zero total)
+    quantities = df.pivot_table(index='Country', columns='Indicator', values='Quantity',
+                                aggfunc='sum', fill_value=0, observed=True)
+    total_quantity = df.groupby('Country', observed=True)['Quantity'].sum()
+    totals = total_quantity.reindex(quantities.index).to_numpy(dtype=np.float64)[:, None]
+    percentages = np.zeros(quantities.shape, dtype=np.float64)
+    np.divide(quantities.to_numpy(dtype=np.float64), totals, out=percentages, where=totals != 0)
+    percentages *= 100
+    heatmap_df = pd.DataFrame(percentages, index=quantities.index, columns=quantities.columns)
+
+    # Prepare the data for the heatmap, keeping the scenarios in order of appearance
+    heatmap_df = heatmap_df.reindex(index=df['Country'].unique(), columns=list(INDICATORS), fill_value=0)
 
     # Create the heatmap using Plotly
     fig = go.Figure(data=go.Heatmap(
@@ -469,7 +557,21 @@ def create_heatmap(df):
         template="plotly_dark"
     )
 
-    st.plotly_chart(fig)
+    return fig
+
+# Function to compute the cost distribution of each life cycle category from the cost analysis file.
+# It is cached per uploaded file, so the waterfall totals and the pie chart shown on every click
+# are looked up instead of regrouping the data on each rerun.
+
+@st.cache_data
+def lcc_aggregates(file):
+    df = load_data(file, ('Hybrid_M', 'KostM', 'Hybrid_P', 'KostP', 'Hybrid_N', 'KostN', 'Hybrid_E', 'KostE'))
+    return {
+        'Material': df.groupby('Hybrid_M')['KostM'].sum(),
+        'Production': df.groupby('Hybrid_P')['KostP'].sum(),
+        'Nutzung': df.groupby('Hybrid_N')['KostN'].sum(),
+        'End-of-Life': df.groupby('Hybrid_E')['KostE'].sum()
+    }
 
 # Function to create the waterfall chart displaying detailed cost breakdowns
 def detailed_life_cycle_costing(uploaded_file):
@@ -479,18 +581,12 @@ def detailed_life_cycle_costing(uploaded_file):
     (Material, Production, Nutzung, and End-of-Life).
     """
     try:
-        df = load_data(uploaded_file)
+        cost_distributions = lcc_aggregates(uploaded_file)
 
-        # Calculate the total cost in each category
-        hybrid_m_total = df.groupby('Hybrid_M')['KostM'].sum().sum()
-        hybrid_p_total = df.groupby('Hybrid_P')['KostP'].sum().sum()
-        hybrid_n_total = df.groupby('Hybrid_N')['KostN'].sum().sum()
-        hybrid_e_total = df.groupby('Hybrid_E')['KostE'].sum().sum()
-
-        # Prepare data for the waterfall chart
+        # Prepare data for the waterfall chart from the total cost in each category
         waterfall_data = {
-            'Category': ['Material', 'Production', 'Nutzung', 'End-of-Life'],
-            'Kosten': [hybrid_m_total, hybrid_p_total, hybrid_n_total, hybrid_e_total]
+            'Category': list(cost_distributions),
+            'Kosten': [distribution.sum() for distribution in cost_distributions.values()]
         }
 
         # Create the waterfall chart using Plotly
@@ -517,23 +613,13 @@ def detailed_life_cycle_costing(uploaded_file):
         )
 
         # Display the chart
-        selected_points = plotly_events(waterfall_fig, click_event=True, hover_event=False)
+        selected_points = plotly_events(waterfall_fig, click_event=True, hover_event=False, key="waterfall_lcc")
 
-        # Handle click events on the chart
-        if selected_points:
+        # Handle click events on the chart by looking up the precomputed cost distribution
+        if selected_points and selected_points[0]['x'] in cost_distributions:
             selected_category = selected_points[0]['x']
-            if selected_category == 'Material':
-                pie_data = df.groupby('Hybrid_M')['KostM'].sum()
-                title = "Material Kosten Distribution"
-            elif selected_category == 'Production':
-                pie_data = df.groupby('Hybrid_P')['KostP'].sum()
-                title = "Production Kosten Distribution"
-            elif selected_category == 'Nutzung':
-                pie_data = df.groupby('Hybrid_N')['KostN'].sum()
-                title = "Nutzung Kosten Distribution"
-            elif selected_category == 'End-of-Life':
-                pie_data = df.groupby('Hybrid_E')['KostE'].sum()
-                title = "End-of-Life Kosten Distribution"
+            pie_data = cost_distributions[selected_category]
+            title = f"{selected_category} Kosten Distribution"
 
             # Create a pie chart for the selected category
             pie_chart = go.Figure(data=[go.Pie(labels=pie_data.index, values=pie_data.values, textinfo='value')])
@@ -543,54 +629,47 @@ def detailed_life_cycle_costing(uploaded_file):
             )
             
             # Display the pie chart
-            st.plotly_chart(pie_chart)
+            st.plotly_chart(pie_chart, key="pie_lcc")
 
     except Exception as e:
         st.error(f"Error: {e}")
         st.write("Please make sure the uploaded file is a valid Excel file.")
 
 # Function to perform detailed life cycle assessment and generate a sunburst chart
+@st.cache_data(hash_funcs={pd.DataFrame: hash_lca_frame})
 def detailed_lifecycle_assessment(df):
     """
     This function generates a sunburst chart that visualizes the life cycle processes and phases.
     It shows how processes are distributed across different life cycle phases and helps users understand
     the overall life cycle assessment in a hierarchical way.
     """
-    try:
-        processes = df['Process'].unique()
-
-        df['Count'] = 1
+    # Count the rows per life cycle phase and process, and express each count as a
+    # percentage of its phase's total (without modifying the caller's DataFrame)
+    df_grouped = df.groupby(['LifeCyclePhase', 'Process']).size().reset_index(name='Count')
+    df_grouped['Percentage'] = df_grouped['Count'] / df_grouped.groupby('LifeCyclePhase')['Count'].transform('sum') * 100
 
-        df_grouped = df.groupby(['LifeCyclePhase', 'Process']).size().reset_index(name='Count')
-        df_grouped['Percentage'] = df_grouped.groupby('LifeCyclePhase')['Count'].apply(lambda x: 100 * x / float(x.sum())).reset_index(drop=True)
+    # Define color sequence for different life cycle phases
+    color_sequence = ['#FF6500', '#FA6E00', '#F57600', '#F8891B', '#FA9B35']
 
-        # Define color sequence for different life cycle phases
-        color_sequence = ['#FF6500', '#FA6E00', '#F57600', '#F8891B', '#FA9B35']
+    # Generate sunburst chart using Plotly
+    fig = px.sunburst(df_grouped, path=['LifeCyclePhase', 'Process'], values='Count',
+                      hover_data={'Percentage': ':.2f'},
+                      color='LifeCyclePhase',
+                      color_discrete_sequence=color_sequence)
 
-        # Generate sunburst chart using Plotly
-        fig = px.sunburst(df_grouped, path=['LifeCyclePhase', 'Process'], values='Count',
-                          hover_data={'Percentage': ':.2f'},
-                          color='LifeCyclePhase',
-                          color_discrete_sequence=color_sequence)
+    fig.update_traces(textinfo='label+percent entry')
 
-        fig.update_traces(textinfo='label+percent entry')
-
-        # Update layout
-        fig.update_layout(
-            margin=dict(t=50, l=25, r=25, b=25),
-            font=dict(
-                family="Courier New, monospace",
-                size=18,
-                color="#7f7f7f"
-            )
+    # Update layout
+    fig.update_layout(
+        margin=dict(t=50, l=25, r=25, b=25),
+        font=dict(
+            family="Courier New, monospace",
+            size=18,
+            color="#7f7f7f"
         )
+    )
 
-        # Display the sunburst chart
-        st.plotly_chart(fig)
-
-    except Exception as e:
-        st.error(f"Error: {e}")
-        st.write("Please make sure the uploaded data is valid.")
+    return fig
 
 # Run the main function to launch the app
 if __name__ == "__main__":